@@ -1,6 +1,9 @@
 import streamlit as st
 from typing import Dict
 import os
+import math
+import heapq
+import hashlib
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -222,6 +225,299 @@ def joblogs_page():
     st.markdown(table_html, unsafe_allow_html=True)
     st.download_button("Export as Excel", df.to_csv(index=False).encode(), file_name="job_logs.csv", mime="text/csv", key="export_joblogs")
 
+# --- DRILLING ANOMALY DETECTION: online EWMA z-scores + CUSUM change points per well ---
+MONITORED_PARAMS = {
+    # column: (short label, recommended action, smallest meaningful change in the column's units)
+    "Circ. Pressure (PSI)": ("circulating pressure", "check for pack-off, plugged nozzles or debris in the annulus", 50.0),
+    "Free Swivel Torque": ("swivel torque", "inspect motor and mill for stalling or wear before the next run", 50.0),
+    "Weight on Bit": ("weight on bit", "review WOB set point and pick-up/slack-off weights", 200.0),
+    "Drill Time (mins)": ("drill time", "check mill dressing and motor output; plug may be spinning", 1.0),
+    "Plug/Seat Depth Difference": ("plug/seat depth difference", "verify tag depth against the plug set record", 1.0),
+}
+ANOMALY_ALPHA_MEAN = 0.1  # EWMA smoothing factor for the baseline
+ANOMALY_ALPHA_VAR = 0.05  # slower EWMA for the spread, so it isn't underestimated
+ANOMALY_REL_FLOOR = 0.02  # spread floor as a fraction of the baseline, for flat (set point) readings
+ANOMALY_Z = 3.0           # |z| above which a single reading is flagged
+ANOMALY_WARMUP = 5        # readings per parameter before alerts are emitted
+CUSUM_K = 0.5             # CUSUM slack (in standard deviations)
+CUSUM_H = 5.0             # CUSUM decision threshold
+MAX_ALERTS = 500          # alert buffer size across all wells
+
+class ParamState:
+    """O(1) running state for one well/parameter stream.
+
+    The baseline is an exact running mean/variance (Welford) until the EWMA windows fill, then an EWMA.
+    Scores are t-statistics for the next reading mapped back to a normal z, so short histories are not over-flagged.
+    """
+    __slots__ = ('count', 'mean', 'var', 'cusum_pos', 'cusum_neg')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.cusum_pos = 0.0
+        self.cusum_neg = 0.0
+
+    def score(self, x, floor=0.0):
+        """Normal-equivalent z of x against the current baseline (0.0 until two readings are in)."""
+        if self.count < 2:
+            return 0.0
+        n_var = min(self.count, 2 / ANOMALY_ALPHA_VAR - 1)
+        n_mean = min(self.count, 2 / ANOMALY_ALPHA_MEAN - 1)
+        std = (self.var * n_var / (n_var - 1)) ** 0.5
+        scale = max(std, ANOMALY_REL_FLOOR * abs(self.mean), floor) * (1 + 1 / n_mean) ** 0.5
+        if scale == 0:
+            return 0.0
+        t = (x - self.mean) / scale
+        dof = n_var - 1
+        # Wallace (1959) approximation of the t -> normal quantile mapping
+        z = (8 * dof + 1) / (8 * dof + 3) * (dof * math.log1p(t * t / dof)) ** 0.5
+        return math.copysign(z, t)
+
+    def update(self, x, floor=0.0):
+        """Score x against the current baseline, then fold it in. Returns (z, shift) where shift is 'up', 'down' or None."""
+        z = self.score(x, floor)
+        shift = None
+        if self.count >= ANOMALY_WARMUP:
+            zc = max(-ANOMALY_Z, min(ANOMALY_Z, z))  # one outlier alone can't trip the CUSUM
+            self.cusum_pos = max(0.0, self.cusum_pos + zc - CUSUM_K)
+            self.cusum_neg = max(0.0, self.cusum_neg - zc - CUSUM_K)
+            if self.cusum_pos > CUSUM_H:
+                shift, self.cusum_pos = 'up', 0.0
+            elif self.cusum_neg > CUSUM_H:
+                shift, self.cusum_neg = 'down', 0.0
+        self.count += 1
+        w_mean = max(1 / self.count, ANOMALY_ALPHA_MEAN)
+        w_var = max(1 / self.count, ANOMALY_ALPHA_VAR)
+        diff = x - self.mean
+        self.mean += w_mean * diff
+        self.var = (1 - w_var) * (self.var + w_var * diff * diff)
+        return z, shift
+
+class DrillingAnomalyMonitor:
+    """Streaming detector over MONITORED_PARAMS. Feed rows as they are ingested; read ranked alerts back."""
+
+    def __init__(self):
+        self.wells = {}
+        self.sources = set()    # uploads already streamed in, so reruns and re-uploads aren't fed twice
+        self._alerts = []       # min-heap of (score, seq, alert) holding the MAX_ALERTS strongest
+        self._seq = 0
+        self.rows_seen = 0
+
+    def observe(self, well, row_label, readings):
+        """Update the well's state with one row of {column: value} readings and record any alerts."""
+        state = self.wells.setdefault(well, {})
+        self.rows_seen += 1
+        for col, x in readings.items():
+            if x is None or x != x:
+                continue
+            param = state.get(col)
+            if param is None:
+                param = state[col] = ParamState()
+            label, action, floor = MONITORED_PARAMS[col]
+            baseline, warmed_up = param.mean, param.count >= ANOMALY_WARMUP
+            z, shift = param.update(float(x), floor)
+            if not warmed_up:
+                continue
+            if abs(z) >= ANOMALY_Z:
+                direction = 'above' if z > 0 else 'below'
+                self._add_alert(abs(z), well, col, row_label, 'Spike',
+                                f"{label.capitalize()} of {x:,.1f} at {row_label} is {abs(z):.1f}σ {direction} the well's running baseline of {baseline:,.1f}",
+                                action)
+            if shift is not None:
+                self._add_alert(CUSUM_H / 2 + abs(z), well, col, row_label, 'Shift',
+                                f"Sustained {shift}ward shift in {label} detected at {row_label} (baseline was {baseline:,.1f})",
+                                action)
+
+    def ingest(self, df, well, source=None):
+        """Stream every row of a sheet through the detector. Rows carrying their own well id are routed to that well.
+        A source already seen is skipped, so per-well state carries across uploads without double counting."""
+        if source is not None:
+            if source in self.sources:
+                return 0
+            self.sources.add(source)
+        cols = [c for c in MONITORED_PARAMS if c in df.columns]
+        if not cols:
+            return 0
+        values = df[cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        wells = df["Lease/Well#:"].ffill().fillna(well).astype(str).to_numpy() if "Lease/Well#:" in df.columns else None
+        labels = df["Plug/Seat No."].to_numpy() if "Plug/Seat No." in df.columns else None
+        for i, row in enumerate(values):
+            row_label = f"plug {labels[i]}" if labels is not None and labels[i] == labels[i] else f"row {i + 1}"
+            self.observe(wells[i] if wells is not None else well, row_label, dict(zip(cols, row)))
+        return len(values)
+
+    def _add_alert(self, score, well, col, row_label, kind, message, action):
+        alert = {'score': round(score, 2), 'well': well, 'parameter': col, 'at': row_label, 'kind': kind, 'message': message, 'action': action}
+        self._seq += 1
+        entry = (score, self._seq, alert)
+        if len(self._alerts) < MAX_ALERTS:
+            heapq.heappush(self._alerts, entry)
+        else:
+            heapq.heappushpop(self._alerts, entry)
+
+    @property
+    def alerts(self):
+        return self.ranked_alerts()
+
+    def ranked_alerts(self, limit=None):
+        return [alert for _, _, alert in heapq.nlargest(limit or len(self._alerts), self._alerts)]
+
+    def recommendations(self, limit=5):
+        """One line per top alert: what was seen, and what to do about it."""
+        return [f"[{a['well']}] {a['message']} - {a['action']}" for a in self.ranked_alerts(limit)]
+
+def get_anomaly_monitor():
+    if 'anomaly_monitor' not in st.session_state:
+        st.session_state['anomaly_monitor'] = DrillingAnomalyMonitor()
+    return st.session_state['anomaly_monitor']
+
+# --- EQUIPMENT LEDGER: run counts and run-hours per tool, indexed by (Tool, Date) ---
+MAINTENANCE_THRESHOLDS = {
+    # tool type: (run hours, runs) before service is due
+    'Motor': (100.0, 60),
+    'Mill': (25.0, 20),
+}
+MAINTENANCE_WARN = 0.8    # fraction of service life that flags a tool as due soon
+COMMENTS_COL = "Comments  (Motor Serial #, Sweep bbls, etc...)"
+# "S/N: AB-1234", "Serial No. 4471" -> the marker must be a whole word and the serial must contain a digit
+SERIAL_PATTERN = r'(?i:(?:\bs/?n\b|\bserial\b(?:\s*(?:number\b|num\b\.?|no\b\.?|#))?)\s*[:#-]?\s*)((?=[A-Za-z-]*\d)[A-Za-z0-9][A-Za-z0-9-]*)\b'
+# "new motor", "changed out motor", "motor swap" -> the previous motor's serial stops carrying forward
+MOTOR_CHANGE_PATTERN = r'(?i)\b(?:new|chang\w*|swap\w*|replac\w*|switch\w*)\s+(?:out\s+)?motor\b|\bmotor\s+(?:chang\w*|swap\w*|replac\w*)'
+
+def _sheet_column(df, name, header=None):
+    """Column by name, accepting the header-field spelling with a trailing colon.
+    Falls back to the sheet's header-field value (broadcast over every row) when there is no such column."""
+    for col in (name, f"{name}:"):
+        if col in df.columns:
+            return df[col]
+    return pd.Series((header or {}).get(f"{name}:", np.nan), index=df.index)
+
+def _header_field(raw_df, label):
+    """Value to the right of a header-field label (e.g. "Start Date:") in a sheet parsed with header=None."""
+    cells = raw_df.stack()
+    hits = cells[cells.astype(str).str.strip().str.lower() == label.lower()]
+    for row, col in hits.index:
+        after = raw_df.loc[row, col:].iloc[1:].dropna()
+        # an empty field is followed directly by the next label
+        if not after.empty and not str(after.iloc[0]).strip().endswith(':'):
+            return after.iloc[0]
+    return None
+
+class EquipmentLedger:
+    """Tool usage accumulated across ingested job logs. Every row with a drill time is one run for its motor and its mill."""
+
+    def __init__(self):
+        self.runs = pd.DataFrame({'Tool': pd.Series(dtype=object), 'Tool Type': pd.Series(dtype=object), 'Date': pd.Series(dtype='datetime64[ns]'), 'Run Hours': pd.Series(dtype=float)})
+        self.sources = set()        # uploads already ingested, so reruns and re-uploads aren't double counted
+        self.service_marks = {}     # tool -> number of ledger runs at its last service
+        self._rebuild()
+
+    @property
+    def empty(self):
+        return self.runs.empty
+
+    def ingest(self, df, source=None, header=None):
+        """Append the runs found in a sheet and refresh the daily and summary tables. A source already seen is skipped.
+
+        header holds the sheet's header fields (see read_job_sheet); "Start Date:", "Motor Type:", "Motor Size:" and
+        "Mill Type:" are taken from it when the table has no such column. Runs are dated from a full "Tag Time"
+        timestamp, else the start date; runs with neither stay undated rather than being stamped with the upload day.
+        """
+        if source is not None:
+            if source in self.sources:
+                return 0
+            self.sources.add(source)
+        if "Drill Time (mins)" not in df.columns:
+            return 0
+        hours = pd.to_numeric(df["Drill Time (mins)"], errors='coerce') / 60
+        dates = pd.to_datetime(_sheet_column(df, 'Start Date', header), errors='coerce').ffill()
+        if "Tag Time" in df.columns and pd.api.types.is_datetime64_any_dtype(df["Tag Time"]):
+            dates = df["Tag Time"].fillna(dates)
+        dates = dates.dt.normalize()
+        # Serial numbers are usually noted once per motor change, so they carry forward until the next change
+        comments = _sheet_column(df, COMMENTS_COL).astype('string')
+        serial = comments.str.extract(SERIAL_PATTERN, expand=False)
+        changed = comments.str.contains(MOTOR_CHANGE_PATTERN, na=False) & serial.isna()
+        serial = serial.mask(changed, '').ffill().replace('', pd.NA).str.upper()
+        model = (_sheet_column(df, 'Motor Type', header).ffill().astype('string').fillna('') + ' ' + _sheet_column(df, 'Motor Size', header).ffill().astype('string').fillna('')).str.strip()
+        motors = ('Motor SN ' + serial).fillna('Motor ' + model.mask(model == ''))
+        mills = 'Mill ' + _sheet_column(df, 'Mill Type', header).ffill().astype('string')
+        frames = [
+            pd.DataFrame({'Tool': tools.astype(object), 'Tool Type': tool_type, 'Date': dates, 'Run Hours': hours}).dropna(subset=['Tool', 'Run Hours'])
+            for tool_type, tools in (('Motor', motors), ('Mill', mills))
+        ]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return 0
+        self.runs = pd.concat(frames if self.runs.empty else [self.runs, *frames], ignore_index=True)
+        self._rebuild()
+        return sum(len(f) for f in frames)
+
+    def _rebuild(self):
+        runs = self.runs
+        self.daily = runs.groupby(['Tool', 'Date']).agg(**{'Tool Type': ('Tool Type', 'first'), 'Runs': ('Run Hours', 'size'), 'Run Hours': ('Run Hours', 'sum')}).sort_index()
+        cumulative = self.daily.groupby(level='Tool')[['Runs', 'Run Hours']].cumsum()
+        self.daily['Cumulative Runs'] = cumulative['Runs']
+        self.daily['Cumulative Hours'] = cumulative['Run Hours']
+        summary = runs.groupby('Tool').agg(**{'Tool Type': ('Tool Type', 'first'), 'Runs': ('Run Hours', 'size'), 'Run Hours': ('Run Hours', 'sum'), 'Days Used': ('Date', 'nunique'), 'Last Used': ('Date', 'max')})
+        summary['Undated Runs'] = runs['Date'].isna().groupby(runs['Tool']).sum().reindex(summary.index, fill_value=0).astype(int)
+        since_service = np.arange(len(runs)) >= runs['Tool'].map(self.service_marks).fillna(0).to_numpy()
+        serviced = runs[since_service].groupby('Tool')['Run Hours'].agg(['size', 'sum']).reindex(summary.index, fill_value=0)
+        summary['Runs Since Service'] = serviced['size'].astype(int)
+        summary['Hours Since Service'] = serviced['sum'].astype(float)
+        hour_limit = summary['Tool Type'].map({k: v[0] for k, v in MAINTENANCE_THRESHOLDS.items()})
+        run_limit = summary['Tool Type'].map({k: v[1] for k, v in MAINTENANCE_THRESHOLDS.items()})
+        summary['Avg Run Time'] = summary['Run Hours'] / summary['Runs']
+        summary['Life Used %'] = (np.maximum(summary['Hours Since Service'] / hour_limit, summary['Runs Since Service'] / run_limit) * 100).astype(float).round(1)
+        summary['Maintenance Due'] = (summary['Life Used %'] >= 100).astype(bool)
+        self.summary = summary
+
+    def reset_service(self, tool):
+        """Restart the tool's maintenance counters; its lifetime totals are kept."""
+        self.service_marks[tool] = len(self.runs)
+        self._rebuild()
+
+    def usage_on(self, tool):
+        """Daily and cumulative usage for one tool, indexed by date (empty if it has no dated runs)."""
+        if tool not in self.daily.index.get_level_values('Tool'):
+            return self.daily.iloc[0:0].droplevel('Tool')
+        return self.daily.xs(tool, level='Tool')
+
+    def maintenance_due(self):
+        """Tools at or past their service limits."""
+        return self.summary.index[self.summary['Maintenance Due']].tolist()
+
+def get_equipment_ledger():
+    if 'equipment_ledger' not in st.session_state:
+        st.session_state['equipment_ledger'] = EquipmentLedger()
+    return st.session_state['equipment_ledger']
+
+# --- JOB SHEET PARSING ---
+HEADER_FIELDS = ["Lease/Well#:", "Start Date:", "Motor Type:", "Motor Size:", "Mill Type:"]
+
+def read_job_sheet(xls, sheet):
+    """Parse one sheet of a job log: the data table, plus the HEADER_FIELDS found in the block above it.
+    Returns (df, header); df is None when no table is found."""
+    raw_df = xls.parse(sheet, header=None)
+    header = {}
+    for label in HEADER_FIELDS:
+        value = _header_field(raw_df, label)
+        if value is not None:
+            header[label] = value
+    header_row = None
+    for i, row in raw_df.iterrows():
+        # the table header is the first wide row that isn't mostly "Label:" / value pairs
+        if row.count() >= 3 and row.dropna().astype(str).str.strip().str.endswith(':').mean() < 0.5:
+            header_row = i
+            break
+    if header_row is None:
+        return None, header
+    df = xls.parse(sheet, header=header_row)
+    df = df.dropna(axis=1, how='all')
+    df = df.loc[:, df.notna().any()]
+    return df, header
+
 # --- UPLOAD PAGE: General Info as Job Summary cards (4 in a row, matching analytics style) ---
 def upload_page():
     st.title("Upload Data")
@@ -243,6 +539,7 @@ def upload_page():
     ]
     upload_error = None
     all_sheets_data = []
+    sheet_headers = {}
     if uploaded_file is not None:
         try:
             if uploaded_file.name.endswith("csv"):
@@ -254,21 +551,22 @@ def upload_page():
             else:
                 xls = pd.ExcelFile(uploaded_file)
                 for sheet in xls.sheet_names:
-                    raw_df = xls.parse(sheet, header=None)
-                    header_row = None
-                    for i, row in raw_df.iterrows():
-                        if row.count() >= 3:
-                            header_row = i
-                            break
-                    if header_row is not None:
-                        df = pd.read_excel(uploaded_file, sheet_name=sheet, header=header_row)
-                        df = df.dropna(axis=1, how='all')
-                        df = df.loc[:, df.notna().any()]
+                    df, sheet_headers[sheet] = read_job_sheet(xls, sheet)
+                    if df is not None:
                         all_sheets_data.append((sheet, df))
                     else:
                         st.warning(f"Could not detect data table in sheet: {sheet}")
                 if all_sheets_data:
                     st.success(f"Processed {len(all_sheets_data)} sheet(s)!")
+            # Identify uploads by content: a corrected file under the same name is new, a renamed copy is not
+            upload_key = hashlib.sha1(uploaded_file.getvalue()).hexdigest()
+            # The monitor and ledger accumulate across uploads; both skip sheets they have already seen
+            monitor = get_anomaly_monitor()
+            ledger = get_equipment_ledger()
+            for sheet, df in all_sheets_data:
+                header = sheet_headers.get(sheet) or {}
+                monitor.ingest(df, well=str(header.get("Lease/Well#:", sheet)), source=(upload_key, sheet))
+                ledger.ingest(df, source=(upload_key, sheet), header=header)
             if all_sheets_data:
                 st.session_state['sheet_data'] = all_sheets_data[0][1]
                 st.session_state['sheet_name'] = all_sheets_data[0][0]
@@ -389,7 +687,6 @@ def analytics_page():
     }
     equipment_freq = {
         'deployment_success_rate': 83,
-        'performance_distribution': {'excellent': 7, 'good': 2, 'poor': 1},
     }
     mill_perf = {
         'total_plugs_drilled': 10,
@@ -405,21 +702,12 @@ def analytics_page():
         'efficiency_rating': 'Excellent',
     }
     daily_breakdown = [
-        {'day': f'Day {i+1}', 'date': f'2025-06-{12+i}', 'activities': np.random.randint(8, 15), 'work_hours': np.random.uniform(8, 12), 'downtime': np.random.uniform(0, 2), 'mill_operations': np.random.randint(1, 3), 'ct_operations': np.random.randint(0, 2), 'equipment': ['FT3', 'FT6'] if i%2==0 else ['FT1', 'FT2']} for i in range(7)
-    ]
-    equipment_usage = {
-        'FT3': {'tool_type': 'Mill', 'usage_count': 5, 'success_rate': 98, 'avg_deployment_time': 1.2, 'maintenance_due': False},
-        'FT6': {'tool_type': 'CT', 'usage_count': 4, 'success_rate': 92, 'avg_deployment_time': 1.5, 'maintenance_due': True},
-        'FT1': {'tool_type': 'Mill', 'usage_count': 3, 'success_rate': 85, 'avg_deployment_time': 1.1, 'maintenance_due': False},
-        'FT2': {'tool_type': 'CT', 'usage_count': 2, 'success_rate': 80, 'avg_deployment_time': 1.3, 'maintenance_due': False},
-    }
-    recommendations = [
-        "✅ Excellent drilling performance with 42.3 min average - maintain current operational parameters",
-        "🔧 2 tools (FT3, FT6) require maintenance review before next deployment",
-        "🎯 High drilling efficiency achieved (88%) - consider sharing best practices with other crews",
-        "💡 CT operations showing excellent efficiency (36.8 min avg) - optimize for future jobs",
-        "🛡️ Maintain excellent safety record with continued JSA compliance and observation protocols"
+        {'day': f'Day {i+1}', 'date': f'2025-06-{12+i}', 'activities': np.random.randint(8, 15), 'work_hours': np.random.uniform(8, 12), 'downtime': np.random.uniform(0, 2), 'mill_operations': np.random.randint(1, 3), 'ct_operations': np.random.randint(0, 2)} for i in range(7)
     ]
+    equipment_ledger = get_equipment_ledger()
+    anomaly_monitor = get_anomaly_monitor()
+    anomaly_alerts = anomaly_monitor.ranked_alerts(limit=5)
+    recommendations = anomaly_monitor.recommendations(limit=5)
     # --- Job Summary and KPIs as a single HTML block (matches your provided HTML) ---
     # Only show Total Activities card
     total_activities_card = """
@@ -507,39 +795,49 @@ def analytics_page():
     # --- Equipment Analysis ---
     st.header("🔧 Equipment Utilization Analysis")
     col1, col2 = st.columns(2)
-    eq_df = pd.DataFrame([
-        {'Tool': tool, 'Tool Type': info['tool_type'], 'Usage Count': info['usage_count'], 'Success Rate': info['success_rate'], 'Avg Deployment Time': info['avg_deployment_time'], 'Maintenance Due': info['maintenance_due']} for tool, info in equipment_usage.items()
-    ])
+    eq_df = equipment_ledger.summary.reset_index()
+    eq_df['Status'] = np.select(
+        [eq_df['Maintenance Due'], eq_df['Life Used %'] >= MAINTENANCE_WARN * 100],
+        ["🔴 Maintenance Required", "🟡 Due Soon"],
+        default="🟢 OK",
+    )
     with col1:
-        fig_eq_usage = px.bar(eq_df, x='Tool', y='Usage Count', title='Equipment Usage Frequency', color='Success Rate', color_continuous_scale='RdYlGn', hover_data=['Tool Type', 'Avg Deployment Time'])
-        st.plotly_chart(fig_eq_usage, use_container_width=True)
+        if equipment_ledger.empty:
+            st.info("No equipment runs ingested yet. Upload a job log on 'Upload Data' to build the equipment ledger.")
+        else:
+            fig_eq_usage = px.bar(eq_df, x='Tool', y='Runs', title='Equipment Usage Frequency', color='Life Used %', color_continuous_scale='RdYlGn_r', hover_data=['Tool Type', 'Run Hours', 'Avg Run Time'])
+            st.plotly_chart(fig_eq_usage, use_container_width=True)
     with col2:
-        fig_performance = px.pie(values=list(equipment_freq['performance_distribution'].values()), names=list(equipment_freq['performance_distribution'].keys()), title='Equipment Performance Distribution', color_discrete_map={'excellent': '#28a745', 'good': '#17a2b8', 'poor': '#dc3545'})
-        st.plotly_chart(fig_performance, use_container_width=True)
+        if not equipment_ledger.empty:
+            status_counts = eq_df['Status'].value_counts()
+            fig_status = px.pie(values=status_counts.values, names=status_counts.index, title='Equipment Maintenance Status', color=status_counts.index, color_discrete_map={"🟢 OK": '#28a745', "🟡 Due Soon": '#ffc107', "🔴 Maintenance Required": '#dc3545'})
+            st.plotly_chart(fig_status, use_container_width=True)
     st.subheader("🔍 Equipment Details & Maintenance Status")
+    tools_due = equipment_ledger.maintenance_due()
+    if tools_due:
+        st.warning(f"🔧 {len(tools_due)} tool(s) require maintenance before next deployment: {', '.join(tools_due)}")
     eq_display = eq_df.copy()
-    def get_status_emoji(row):
-        if row['Maintenance Due']:
-            return "🔴 Maintenance Required"
-        elif row['Success Rate'] >= 95:
-            return "🟢 Excellent"
-        elif row['Success Rate'] >= 85:
-            return "🟡 Good"
-        else:
-            return "🟠 Needs Attention"
-    eq_display['Status'] = eq_display.apply(get_status_emoji, axis=1)
-    eq_display['Success Rate'] = eq_display['Success Rate'].apply(lambda x: f"{x:.0f}%")
-    eq_display['Avg Deployment Time'] = eq_display['Avg Deployment Time'].apply(lambda x: f"{x:.1f}h")
-    st.dataframe(eq_display[['Tool', 'Tool Type', 'Usage Count', 'Success Rate', 'Avg Deployment Time', 'Status']], use_container_width=True)
+    eq_display['Life Used %'] = eq_display['Life Used %'].map("{:.0f}%".format)
+    eq_display['Run Hours'] = eq_display['Run Hours'].map("{:.1f}h".format)
+    eq_display['Avg Run Time'] = eq_display['Avg Run Time'].map("{:.2f}h".format)
+    eq_display['Hours Since Service'] = eq_display['Hours Since Service'].map("{:.1f}h".format)
+    st.dataframe(eq_display[['Tool', 'Tool Type', 'Runs', 'Run Hours', 'Avg Run Time', 'Runs Since Service', 'Hours Since Service', 'Life Used %', 'Status']], use_container_width=True)
+    if not equipment_ledger.empty:
+        service_col1, service_col2 = st.columns([3, 1])
+        with service_col1:
+            serviced_tool = st.selectbox("Record a service", eq_df['Tool'], key='service_tool')
+        with service_col2:
+            if st.button("Mark as serviced", key='service_reset'):
+                equipment_ledger.reset_service(serviced_tool)
+                st.rerun()
     # --- Detailed Daily Breakdown ---
     st.header("📅 Detailed Daily Operations")
     tab1, tab2, tab3 = st.tabs(["📊 Overview", "⏱️ Drilling Timeline", "🛠️ Equipment Schedule"])
     with tab1:
         daily_detailed = daily_data.copy()
         daily_detailed['Efficiency'] = (daily_detailed['activities'] / daily_detailed['work_hours']).round(2)
-        daily_detailed['Equipment Count'] = daily_detailed['equipment'].apply(len)
         daily_detailed['Total Drilling Ops'] = daily_detailed['mill_operations'] + daily_detailed['ct_operations']
-        st.dataframe(daily_detailed[['day', 'date', 'activities', 'work_hours', 'downtime', 'mill_operations', 'ct_operations', 'Total Drilling Ops', 'Equipment Count', 'Efficiency']], use_container_width=True)
+        st.dataframe(daily_detailed[['day', 'date', 'activities', 'work_hours', 'downtime', 'mill_operations', 'ct_operations', 'Total Drilling Ops', 'Efficiency']], use_container_width=True)
     with tab2:
         fig_drilling_timeline = go.Figure()
         fig_drilling_timeline.add_trace(go.Bar(name='Mill Operations', x=daily_data['day'], y=daily_data['mill_operations'], marker_color='#dc3545', width=0.4, offset=-0.2))
@@ -547,41 +845,45 @@ def analytics_page():
         fig_drilling_timeline.update_layout(title='Drilling Operations Timeline', xaxis_title='Day', yaxis_title='Number of Operations', barmode='group', height=400)
         st.plotly_chart(fig_drilling_timeline, use_container_width=True)
     with tab3:
-        equipment_schedule = []
-        for day_data in daily_breakdown:
-            for equipment in day_data.get('equipment', []):
-                equipment_schedule.append({'Day': day_data['day'], 'Date': day_data['date'], 'Equipment': equipment, 'Work Hours': day_data['work_hours']})
-        if equipment_schedule:
-            eq_schedule_df = pd.DataFrame(equipment_schedule)
-            fig_eq_schedule = px.density_heatmap(eq_schedule_df, x='Day', y='Equipment', title='Equipment Usage Schedule', color_continuous_scale='Blues')
-            st.plotly_chart(fig_eq_schedule, use_container_width=True)
-            eq_utilization = eq_schedule_df.groupby('Equipment').agg({'Day': 'count', 'Work Hours': 'sum'}).rename(columns={'Day': 'Days Used', 'Work Hours': 'Total Hours'})
+        if not equipment_ledger.empty:
+            undated_runs = int(equipment_ledger.summary['Undated Runs'].sum())
+            if equipment_ledger.daily.empty:
+                st.info("No dated runs to schedule - the uploaded sheets have no 'Start Date:' header field or dated tag times.")
+            else:
+                eq_schedule_df = equipment_ledger.daily.reset_index()
+                fig_eq_schedule = px.density_heatmap(eq_schedule_df, x='Date', y='Tool', z='Run Hours', histfunc='sum', title='Equipment Usage Schedule', color_continuous_scale='Blues')
+                st.plotly_chart(fig_eq_schedule, use_container_width=True)
+            if undated_runs:
+                st.caption(f"{undated_runs} run(s) have no job date and are left out of the schedule, Days Used and Last Used; they still count toward runs, hours and maintenance.")
+            eq_utilization = equipment_ledger.summary[['Tool Type', 'Days Used', 'Runs', 'Undated Runs', 'Run Hours', 'Last Used']].rename(columns={'Run Hours': 'Total Hours'})
             st.subheader("Equipment Utilization Summary")
             st.dataframe(eq_utilization, use_container_width=True)
+            drill_tool = st.selectbox("Tool drill-down", equipment_ledger.summary.index, key='drill_down_tool')
+            tool_usage = equipment_ledger.usage_on(drill_tool).reset_index()
+            if tool_usage.empty:
+                st.info(f"{drill_tool} has no dated runs to chart.")
+            else:
+                fig_tool_usage = go.Figure()
+                fig_tool_usage.add_trace(go.Bar(name='Run Hours', x=tool_usage['Date'], y=tool_usage['Run Hours'], marker_color='#2a5298'))
+                fig_tool_usage.add_trace(go.Scatter(name='Cumulative Hours', x=tool_usage['Date'], y=tool_usage['Cumulative Hours'], mode='lines+markers', line=dict(color='#dc3545', width=3)))
+                fig_tool_usage.update_layout(title=f'{drill_tool} Usage', xaxis_title='Date', yaxis_title='Hours')
+                st.plotly_chart(fig_tool_usage, use_container_width=True)
         else:
             st.info("No equipment schedule data available")
     # --- Recommendations ---
     st.header("💡 AI-Powered Recommendations")
-    for i, rec in enumerate(recommendations, 1):
-        if 'excellent' in rec.lower() or 'maintain' in rec.lower():
-            rec_type = "success-metric"
-            icon = "✅"
-        elif 'maintenance' in rec.lower() or 'require' in rec.lower():
-            rec_type = "warning-metric"  
-            icon = "⚠️"
-        elif 'efficiency' in rec.lower() or 'optimize' in rec.lower():
-            rec_type = "drill-metric"
-            icon = "🎯"
-        elif 'safety' in rec.lower():
-            rec_type = "success-metric"
-            icon = "🛡️"
-        else:
-            rec_type = "metric-card"
-            icon = "💡"
+    alert_styles = {'Spike': ("warning-metric", "⚠️", '#dc3545'), 'Shift': ("drill-metric", "📉", '#f0ad4e')}
+    if not anomaly_monitor.rows_seen:
+        st.info("No drilling data ingested yet. Upload a job log on 'Upload Data' to generate recommendations.")
+    elif not anomaly_alerts:
+        st.success(f"✅ No anomalies across {anomaly_monitor.rows_seen} ingested rows in {len(anomaly_monitor.wells)} well(s) - maintain current operational parameters")
+    for i, alert in enumerate(anomaly_alerts, 1):
+        rec_type, icon, border = alert_styles[alert['kind']]
         st.markdown(f"""
-        <div class="metric-card {rec_type}" style="background: #f8f9fa; padding: 1.5rem; border-radius: 10px; border-left: 5px solid #2a5298; margin-bottom: 1rem; box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);">
-            <h4 style="margin: 0; color: #333;">{icon} Recommendation {i}</h4>
-            <p style="margin: 0.5rem 0 0 0; color: #666;">{rec}</p>
+        <div class="metric-card {rec_type}" style="background: #f8f9fa; padding: 1.5rem; border-radius: 10px; border-left: 5px solid {border}; margin-bottom: 1rem; box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);">
+            <h4 style="margin: 0; color: #333;">{icon} Recommendation {i} · {alert['well']} · {alert['parameter']} <span style="color:#888;font-size:0.8em;">(score {alert['score']})</span></h4>
+            <p style="margin: 0.5rem 0 0 0; color: #666;">{alert['message']}.</p>
+            <p style="margin: 0.3rem 0 0 0; color: #2a5298;"><b>Action:</b> {alert['action']}</p>
         </div>
         """, unsafe_allow_html=True)
     # --- Advanced Analytics ---
@@ -611,7 +913,7 @@ def analytics_page():
     st.header("📤 Export & Reports")
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.download_button(label="Download Drilling Report (JSON)", data=json.dumps({'Job Information': job_info, 'Drilling Performance': {'Mill Operations': mill_perf, 'CT Operations': ct_perf, 'Overall Efficiency': efficiency['drilling_efficiency']}, 'Key Metrics': {'Total Activities': ops_freq['total_activities'], 'Total Work Hours': ops_freq['total_work_hours'], 'Equipment Success Rate': equipment_freq['deployment_success_rate'], 'Safety Score': efficiency['safety_score']}, 'Equipment Status': equipment_usage, 'Recommendations': recommendations}, indent=2), file_name=f"YJOS_Drilling_Report_{job_info['ticket_number']}.json", mime="application/json")
+        st.download_button(label="Download Drilling Report (JSON)", data=json.dumps({'Job Information': job_info, 'Drilling Performance': {'Mill Operations': mill_perf, 'CT Operations': ct_perf, 'Overall Efficiency': efficiency['drilling_efficiency']}, 'Key Metrics': {'Total Activities': ops_freq['total_activities'], 'Total Work Hours': ops_freq['total_work_hours'], 'Equipment Success Rate': equipment_freq['deployment_success_rate'], 'Safety Score': efficiency['safety_score']}, 'Equipment Status': json.loads(equipment_ledger.summary.to_json(orient='index', date_format='iso')), 'Recommendations': recommendations}, indent=2), file_name=f"YJOS_Drilling_Report_{job_info['ticket_number']}.json", mime="application/json")
     with col2:
         daily_csv = pd.DataFrame(daily_breakdown)
         st.download_button(label="Download Daily Operations CSV", data=daily_csv.to_csv(index=False), file_name=f"YJOS_Daily_Operations_{job_info['ticket_number']}.csv", mime="text/csv")
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+pytest.importorskip("streamlit")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("matplotlib")
+
+from streamlit_app import MAX_ALERTS, DrillingAnomalyMonitor
+
+
+def test_step_after_flat_baseline_is_flagged():
+    monitor = DrillingAnomalyMonitor()
+    for plug in range(1, 7):
+        monitor.observe("Well #1", f"plug {plug}", {"Weight on Bit": 5000.0})
+    for plug in range(7, 10):
+        monitor.observe("Well #1", f"plug {plug}", {"Weight on Bit": 20000.0})
+    spikes = [a for a in monitor.alerts if a["kind"] == "Spike"]
+    assert spikes and spikes[0]["at"] == "plug 7"
+
+
+def test_single_outlier_is_not_a_shift():
+    monitor = DrillingAnomalyMonitor()
+    for plug in range(1, 7):
+        monitor.observe("Well #1", f"plug {plug}", {"Weight on Bit": 5000.0})
+    monitor.observe("Well #1", "plug 7", {"Weight on Bit": 20000.0})
+    assert [a["kind"] for a in monitor.alerts] == ["Spike"]
+
+
+def test_false_alert_rate_on_stationary_input():
+    rng = random.Random(0)
+    wells, spiked, shifted = 1000, 0, 0
+    for _ in range(wells):
+        monitor = DrillingAnomalyMonitor()
+        for row in range(20):
+            monitor.observe("Well", f"row {row + 1}", {"Drill Time (mins)": rng.gauss(45, 5)})
+        kinds = {a["kind"] for a in monitor.alerts}
+        spiked += "Spike" in kinds
+        shifted += "Shift" in kinds
+    # a calibrated 3-sigma test over ~15 scored rows flags about 4% of wells
+    assert spiked / wells < 0.07
+    assert shifted / wells < 0.04
+
+
+def test_alert_buffer_keeps_the_strongest_alerts():
+    monitor = DrillingAnomalyMonitor()
+    for i in range(MAX_ALERTS + 50):
+        monitor._add_alert(float(i), "Well", "Weight on Bit", f"row {i}", "Spike", "", "")
+    ranked = monitor.ranked_alerts()
+    assert len(ranked) == MAX_ALERTS
+    assert ranked[0]["score"] == MAX_ALERTS + 49
+    assert ranked[-1]["score"] == 50
+    assert [a["score"] for a in monitor.ranked_alerts(3)] == [MAX_ALERTS + 49, MAX_ALERTS + 48, MAX_ALERTS + 47]
+
+
+def wob_sheet(values):
+    return pd.DataFrame({"Plug/Seat No.": range(1, len(values) + 1), "Weight on Bit": values})
+
+
+def test_well_state_carries_across_sheets_and_uploads():
+    monitor = DrillingAnomalyMonitor()
+    monitor.ingest(wob_sheet([5000.0] * 6), well="Well #1", source=("job1", "Mill Runs"))
+    monitor.ingest(wob_sheet([5000.0] * 6), well="Well #1", source=("job1", "Mill Runs"))
+    assert monitor.wells["Well #1"]["Weight on Bit"].count == 6
+    monitor.ingest(wob_sheet([20000.0]), well="Well #1", source=("job2", "CT Runs"))
+    assert list(monitor.wells) == ["Well #1"]
+    assert [(a["well"], a["kind"]) for a in monitor.alerts] == [("Well #1", "Spike")]
@@ -0,0 +1,129 @@
+import io
+import re
+
+import pytest
+
+pytest.importorskip("streamlit")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("matplotlib")
+
+from streamlit_app import SERIAL_PATTERN, MOTOR_CHANGE_PATTERN, COMMENTS_COL, EquipmentLedger, read_job_sheet
+
+
+def run_sheet(drill_times, serial="SN 1234", mill="5-blade"):
+    return pd.DataFrame({
+        "Drill Time (mins)": drill_times,
+        "Mill Type": [mill] * len(drill_times),
+        COMMENTS_COL: [serial] + [None] * (len(drill_times) - 1),
+    })
+
+
+@pytest.mark.parametrize("comment, serial", [
+    ("S/N: AB-1234, 10 bbl sweep", "AB-1234"),
+    ("sn 4471a", "4471a"),
+    ("SN-123", "123"),
+    ("Serial # 4471-A", "4471-A"),
+    ("Serial number 99812", "99812"),
+    ("serial no. 55", "55"),
+    ("Motor #7", None),
+    ("Snubbing unit rigged up", None),
+    ("unsnapped", None),
+    ("Motor 2-7/8 PDM", None),
+    ("Motor stalled at 9800", None),
+    ("new motor, serial ABC", None),
+])
+def test_serial_pattern(comment, serial):
+    match = re.search(SERIAL_PATTERN, comment)
+    assert (match.group(1) if match else None) == serial
+
+
+@pytest.mark.parametrize("comment, changed", [
+    ("new motor, serial ABC", True),
+    ("Changed out motor", True),
+    ("motor swap at 9800", True),
+    ("Motor stalled at 9800", False),
+    ("New mill on", False),
+])
+def test_motor_change_pattern(comment, changed):
+    assert bool(re.search(MOTOR_CHANGE_PATTERN, comment)) == changed
+
+
+def test_motor_change_stops_the_serial_carrying_forward():
+    sheet = run_sheet([60, 60, 60, 60])
+    sheet[COMMENTS_COL] = ["S/N: AB-1234", None, "new motor, serial ABC", None]
+    ledger = EquipmentLedger()
+    ledger.ingest(sheet, source="job1", header={"Motor Type:": "PDM"})
+    motors = ledger.summary[ledger.summary["Tool Type"] == "Motor"]["Runs"].to_dict()
+    assert motors == {"Motor PDM": 2, "Motor SN AB-1234": 2}
+
+
+def test_ledger_accumulates_across_uploads_without_double_counting():
+    ledger = EquipmentLedger()
+    ledger.ingest(run_sheet([60, 30]), source=("job1.xlsx", 100, "Mill"))
+    ledger.ingest(run_sheet([60, 30]), source=("job1.xlsx", 100, "Mill"))
+    ledger.ingest(run_sheet([90]), source=("job2.xlsx", 200, "Mill"))
+    motor = ledger.summary.loc["Motor SN 1234"]
+    assert motor["Runs"] == 3
+    assert motor["Run Hours"] == pytest.approx(3.0)
+
+
+def test_reset_service_restarts_maintenance_counters():
+    ledger = EquipmentLedger()
+    ledger.ingest(run_sheet([60] * 30), source="job1")
+    assert "Mill 5-blade" in ledger.maintenance_due()
+    ledger.reset_service("Mill 5-blade")
+    mill = ledger.summary.loc["Mill 5-blade"]
+    assert (mill["Runs"], mill["Runs Since Service"], mill["Maintenance Due"]) == (30, 0, False)
+    ledger.ingest(run_sheet([60] * 2), source="job2")
+    assert ledger.summary.loc["Mill 5-blade", "Runs Since Service"] == 2
+
+
+def job_log_xlsx(comments):
+    """A sheet laid out like a real job log: header fields in label/value pairs above the run table."""
+    pytest.importorskip("openpyxl")
+    rows = [
+        ["Lease/Well#:", "Well #1", "Start Date:", "2025-06-12"],
+        ["Motor Type:", "PDM", "Motor Size:", "2 7/8"],
+        ["Mill Type:", "5-blade", None, None],
+        [None, None, None, None],
+        ["Plug/Seat No.", "Tag Time", "Drill Time (mins)", COMMENTS_COL],
+    ] + [[i + 1, f"{8 + i:02d}:30", 60, comment] for i, comment in enumerate(comments)]
+    buffer = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, sheet_name="Mill Runs", header=False, index=False)
+    buffer.seek(0)
+    return pd.ExcelFile(buffer)
+
+
+def test_header_fields_reach_the_ledger_through_sheet_parsing():
+    df, header = read_job_sheet(job_log_xlsx(["S/N: AB-1234", None]), "Mill Runs")
+    assert list(df.columns) == ["Plug/Seat No.", "Tag Time", "Drill Time (mins)", COMMENTS_COL]
+    assert header == {"Lease/Well#:": "Well #1", "Start Date:": "2025-06-12", "Motor Type:": "PDM", "Motor Size:": "2 7/8", "Mill Type:": "5-blade"}
+    ledger = EquipmentLedger()
+    ledger.ingest(df, source="job1", header=header)
+    assert ledger.summary["Runs"].to_dict() == {"Mill 5-blade": 2, "Motor SN AB-1234": 2}
+    assert (ledger.summary["Last Used"] == pd.Timestamp("2025-06-12")).all()
+
+
+def test_motor_model_header_is_used_without_a_serial():
+    df, header = read_job_sheet(job_log_xlsx([None, None]), "Mill Runs")
+    ledger = EquipmentLedger()
+    ledger.ingest(df, source="job1", header=header)
+    assert ledger.summary.loc["Motor PDM 2 7/8", "Runs"] == 2
+
+
+def test_runs_without_a_job_date_stay_undated():
+    ledger = EquipmentLedger()
+    ledger.ingest(run_sheet([60, 30]), source="job1")
+    motor = ledger.summary.loc["Motor SN 1234"]
+    assert motor["Undated Runs"] == 2
+    assert pd.isna(motor["Last Used"])
+    assert ledger.daily.empty
+
+
+def test_usage_on_returns_cumulative_usage_by_date():
+    ledger = EquipmentLedger()
+    ledger.ingest(run_sheet([60, 30]), source="job1", header={"Start Date:": "2025-06-12"})
+    ledger.ingest(run_sheet([90]), source="job2", header={"Start Date:": "2025-06-13"})
+    usage = ledger.usage_on("Motor SN 1234")
+    assert list(usage["Cumulative Hours"]) == pytest.approx([1.5, 3.0])
+    assert ledger.usage_on("Motor SN 9999").empty